@@ -2,77 +2,371 @@
 
 from __future__ import annotations
 
-import json
+import asyncio
+import hashlib
+import importlib.util
 import os
+import random
+import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Mapping
+from typing import BinaryIO
 
-from openai import OpenAI
+import httpx
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    OpenAI,
+    RateLimitError,
+)
 
-from run_experiments import Example
+from run_experiments import Example, PromptLookup, dumps_json, loads_json
 
 
-_PROMPT_FIELDS: tuple[str, ...] = ("prompt", "query", "question", "input")
+_WRITE_BUFFER_SIZE = 1 << 20
+# HTTP/2 needs the optional ``h2`` package (``httpx[http2]``).
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+# Request timeouts and lock conflicts are worth retrying, like the SDK does.
+_RETRYABLE_STATUS_CODES = frozenset({408, 409})
 
 
-def _guess_prompt(payload: Mapping[str, object]) -> str:
-    """Best-effort extraction of the prompt text from the payload."""
+def _resolve_api_key(api_key: str | None) -> str:
+    key = api_key or os.environ.get("OPENAI_API_KEY")
+    if not key:
+        raise ValueError(
+            "An OpenAI API key is required. Provide one via the api_key argument "
+            "or the OPENAI_API_KEY environment variable."
+        )
+    return key
+
+
+def _resolve_output_path(model: str, output_path: Path | None) -> Path:
+    output = output_path or Path("outputs") / f"{model}-responses.jsonl"
+    resolved = output.expanduser().resolve()
+    resolved.parent.mkdir(parents=True, exist_ok=True)
+    return resolved
+
+
+def _open_output(path: Path) -> BinaryIO:
+    return path.open("ab", buffering=_WRITE_BUFFER_SIZE)
+
+
+def _resolve_cache_path(model: str, cache_path: Path | None) -> Path:
+    cache = cache_path or Path("outputs") / f"{model}-cache.jsonl"
+    resolved = cache.expanduser().resolve()
+    resolved.parent.mkdir(parents=True, exist_ok=True)
+    return resolved
+
+
+def _cache_key(model: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class _ResponseCache:
+    """Completions keyed by model and prompt, persisted as JSONL across runs.
+
+    The cache is only a speed-up, so lines that cannot be decoded (such as a
+    record cut in half when a run was killed) are skipped.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._responses: dict[str, str] = {}
+        self._handle: BinaryIO | None = None
+        self._needs_newline = False
+        if path.exists():
+            with path.open("rb") as handle:
+                line = b""
+                for line in handle:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = loads_json(line)
+                        self._responses[entry["key"]] = entry["response"]
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                # Start new records on a fresh line after a truncated one.
+                self._needs_newline = bool(line) and not line.endswith(b"\n")
+
+    def get(self, key: str) -> str | None:
+        return self._responses.get(key)
 
-    for field in _PROMPT_FIELDS:
-        value = payload.get(field)
-        if isinstance(value, str) and value.strip():
-            return value
-    raise KeyError(
-        "Could not find a prompt field in the example. Looked for one of: "
-        + ", ".join(_PROMPT_FIELDS)
-    )
+    def add(self, key: str, response: str) -> None:
+        self._responses[key] = response
+        if self._handle is None:
+            self._handle = _open_output(self._path)
+            if self._needs_newline:
+                self._handle.write(b"\n")
+                self._needs_newline = False
+        self._handle.write(dumps_json({"key": key, "response": response}) + b"\n")
+
+    def close(self) -> None:
+        handle, self._handle = self._handle, None
+        if handle is not None:
+            handle.close()
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Return ``True`` for transient API failures that should be retried."""
+
+    if isinstance(error, (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code in _RETRYABLE_STATUS_CODES
+
+
+def _unpack_completion(completion: object) -> tuple[str | None, dict[str, object] | None]:
+    choices = getattr(completion, "choices", None)
+    message = choices[0].message.content if choices else ""
+    usage = getattr(completion, "usage", None)
+    return message, usage.model_dump() if usage is not None else None
+
+
+def _encode_record(
+    model: str,
+    prompt: str,
+    example: Example,
+    response: str | None,
+    usage: dict[str, object] | None,
+    cached: bool,
+) -> bytes:
+    """Serialise a response record as one UTF-8 encoded JSONL line.
+
+    The example is spliced in from :attr:`Example.json_bytes` rather than being
+    copied into the record dict and encoded again.
+    """
+
+    record = {
+        "model": model,
+        "prompt": prompt,
+        "response": response,
+        "usage": usage,
+        "cached": cached,
+    }
+    encoded = dumps_json(record)
+    return encoded[:-1] + b',"example":' + example.json_bytes + b"}\n"
 
 
 @dataclass
 class ChatGPTRunner:
-    """Callable wrapper that submits each prompt to the ChatGPT API."""
+    """Callable wrapper that submits each prompt to the ChatGPT API.
+
+    Responses are appended through a single buffered handle that stays open
+    until :meth:`close` is called; use the runner as a context manager to make
+    sure buffered records are flushed. Completions are cached by model and
+    prompt in ``cache_path`` (``outputs/<model>-cache.jsonl`` by default), so
+    repeated prompts, including those from earlier runs, are not resubmitted.
+    """
 
     model: str
     api_key: str | None = None
     output_path: Path | None = None
+    cache_path: Path | None = None
+    use_cache: bool = True
 
     def __post_init__(self) -> None:
-        key = self.api_key or os.environ.get("OPENAI_API_KEY")
-        if not key:
-            raise ValueError(
-                "An OpenAI API key is required. Provide one via the api_key argument "
-                "or the OPENAI_API_KEY environment variable."
-            )
+        key = _resolve_api_key(self.api_key)
+        self.output_path = _resolve_output_path(self.model, self.output_path)
+        self.cache_path = _resolve_cache_path(self.model, self.cache_path)
+        self._client = OpenAI(api_key=key)
+        self._prompt = PromptLookup()
+        self._cache = _ResponseCache(self.cache_path) if self.use_cache else None
+        self._handle: BinaryIO | None = None
 
-        output = self.output_path or Path("outputs") / f"{self.model}-responses.jsonl"
-        self._output_path = output.expanduser().resolve()
-        self._output_path.parent.mkdir(parents=True, exist_ok=True)
+    def __enter__(self) -> ChatGPTRunner:
+        if self._handle is None:
+            self._handle = _open_output(self.output_path)
+        return self
 
-        self._client = OpenAI(api_key=key)
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
 
-    @property
-    def output_path(self) -> Path:
-        return self._output_path
+    def close(self) -> None:
+        handle, self._handle = self._handle, None
+        if handle is not None:
+            handle.close()
+        if self._cache is not None:
+            self._cache.close()
 
     def __call__(self, example: Example) -> None:
-        prompt = _guess_prompt(example.payload)
+        prompt = self._prompt(example.payload)
+        cache_key = _cache_key(self.model, prompt)
+
+        response = self._cache.get(cache_key) if self._cache is not None else None
+        usage = None
+        cached = response is not None
+        if not cached:
+            completion = self._client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+            )
+            response, usage = _unpack_completion(completion)
+            if self._cache is not None and response is not None:
+                self._cache.add(cache_key, response)
+
+        if self._handle is None:
+            self._handle = _open_output(self.output_path)
+        self._handle.write(_encode_record(self.model, prompt, example, response, usage, cached))
+
+
+class _RateLimiter:
+    """Token bucket limiting requests and tokens submitted per minute."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float) -> None:
+        self._requests_per_second = requests_per_minute / 60.0
+        self._tokens_per_second = tokens_per_minute / 60.0
+        self._max_requests = requests_per_minute
+        self._max_tokens = tokens_per_minute
+        self._available_requests = requests_per_minute
+        self._available_tokens = tokens_per_minute
+        self._last_update = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last_update
+        self._last_update = now
+        self._available_requests = min(
+            self._max_requests,
+            self._available_requests + elapsed * self._requests_per_second,
+        )
+        self._available_tokens = min(
+            self._max_tokens,
+            self._available_tokens + elapsed * self._tokens_per_second,
+        )
+
+    async def acquire(self, tokens: int) -> None:
+        # A single request larger than the whole bucket would otherwise wait forever.
+        tokens = min(tokens, int(self._max_tokens))
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._available_requests >= 1 and self._available_tokens >= tokens:
+                    self._available_requests -= 1
+                    self._available_tokens -= tokens
+                    return
+                missing_requests = max(0.0, 1 - self._available_requests)
+                missing_tokens = max(0.0, tokens - self._available_tokens)
+                await asyncio.sleep(
+                    max(
+                        missing_requests / self._requests_per_second,
+                        missing_tokens / self._tokens_per_second,
+                    )
+                )
+
+
+@dataclass
+class AsyncChatGPTRunner:
+    """Asynchronous variant of :class:`ChatGPTRunner` for concurrent submission.
+
+    :func:`run_experiments.run_experiments` detects the ``submit`` coroutine and
+    drives many examples at once, while this class throttles the request and
+    token rate and retries rate-limited and other transient failures (connection
+    errors, timeouts, 408, 409 and 5xx responses) with exponential backoff. The
+    client is opened per event loop, so use it as an async context manager.
+    Identical prompts share one request and are cached like in
+    :class:`ChatGPTRunner`. Requests share one pooled HTTP client that
+    multiplexes them over HTTP/2 when ``h2`` is installed.
+    """
 
-        completion = self._client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
+    model: str
+    api_key: str | None = None
+    output_path: Path | None = None
+    cache_path: Path | None = None
+    use_cache: bool = True
+    max_requests_per_minute: float = 500.0
+    max_tokens_per_minute: float = 200_000.0
+    max_attempts: int = 5
+    max_connections: int = 64
+
+    def __post_init__(self) -> None:
+        key = _resolve_api_key(self.api_key)
+        self._api_key = key
+        self.output_path = _resolve_output_path(self.model, self.output_path)
+        self.cache_path = _resolve_cache_path(self.model, self.cache_path)
+        self._prompt = PromptLookup()
+        self._cache = _ResponseCache(self.cache_path) if self.use_cache else None
+        self._in_flight: dict[str, asyncio.Future[tuple[str | None, dict[str, object] | None]]] = {}
+        self._client: AsyncOpenAI | None = None
+        self._limiter: _RateLimiter | None = None
+        self._handle: BinaryIO | None = None
+
+    async def __aenter__(self) -> AsyncChatGPTRunner:
+        http_client = httpx.AsyncClient(
+            http2=_HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            timeout=httpx.Timeout(60.0, connect=10.0),
         )
+        # Closing the OpenAI client in __aexit__ also closes ``http_client``. The
+        # SDK's own retries are disabled so every request passes through the rate
+        # limiter and ``max_attempts`` bounds the total number of calls; the same
+        # transient errors are retried in ``_complete`` instead.
+        self._client = AsyncOpenAI(api_key=self._api_key, http_client=http_client, max_retries=0)
+        self._limiter = _RateLimiter(self.max_requests_per_minute, self.max_tokens_per_minute)
+        self._handle = _open_output(self.output_path)
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        client, self._client, self._limiter = self._client, None, None
+        handle, self._handle = self._handle, None
+        if handle is not None:
+            handle.close()
+        if self._cache is not None:
+            self._cache.close()
+        if client is not None:
+            await client.close()
+
+    async def submit(self, example: Example) -> None:
+        if self._client is None or self._limiter is None or self._handle is None:
+            raise RuntimeError("AsyncChatGPTRunner must be entered with 'async with' before use.")
+
+        prompt = self._prompt(example.payload)
+        cache_key = _cache_key(self.model, prompt)
+
+        response = self._cache.get(cache_key) if self._cache is not None else None
+        usage = None
+        cached = response is not None
+        if not cached:
+            pending = self._in_flight.get(cache_key) if self._cache is not None else None
+            if pending is not None:
+                response, _ = await asyncio.shield(pending)
+                cached = True
+            else:
+                request = asyncio.ensure_future(self._complete(prompt))
+                if self._cache is not None:
+                    self._in_flight[cache_key] = request
+                try:
+                    response, usage = await request
+                finally:
+                    self._in_flight.pop(cache_key, None)
+                if self._cache is not None and response is not None:
+                    self._cache.add(cache_key, response)
+
+        self._handle.write(_encode_record(self.model, prompt, example, response, usage, cached))
 
-        message = completion.choices[0].message.content if completion.choices else ""
+    async def _complete(self, prompt: str) -> tuple[str | None, dict[str, object] | None]:
+        assert self._client is not None and self._limiter is not None
+        # Rough estimate of prompt tokens (about four characters per token).
+        estimated_tokens = len(prompt) // 4 + 1
+        messages = [{"role": "user", "content": prompt}]
 
-        record = {
-            "model": self.model,
-            "prompt": prompt,
-            "response": message,
-            "example": example.to_json(),
-            "usage": getattr(completion, "usage", None),
-        }
+        for attempt in range(1, self.max_attempts):
+            await self._limiter.acquire(estimated_tokens)
+            try:
+                completion = await self._client.chat.completions.create(model=self.model, messages=messages)
+            except (APIConnectionError, APIStatusError) as error:
+                if not _is_retryable(error):
+                    raise
+                await asyncio.sleep(2 ** (attempt - 1) + random.random())
+            else:
+                return _unpack_completion(completion)
 
-        with self._output_path.open("a", encoding="utf-8") as handle:
-            json.dump(record, handle, ensure_ascii=False)
-            handle.write("\n")
+        # Final attempt: let a persistent failure propagate to the caller.
+        await self._limiter.acquire(estimated_tokens)
+        completion = await self._client.chat.completions.create(model=self.model, messages=messages)
+        return _unpack_completion(completion)
@@ -8,45 +8,144 @@ requested category.
 from __future__ import annotations
 
 import argparse
+import asyncio
+import inspect
 import json
-from collections import Counter
-from dataclasses import dataclass
+import mmap
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import AbstractAsyncContextManager, AbstractContextManager, nullcontext, suppress
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from itertools import islice
 from pathlib import Path
-from typing import Callable, Iterator, Mapping, Sequence
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, Mapping, Sequence
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+try:
+    import hyperscan
+except ImportError:  # pragma: no cover - optional speed-up
+    hyperscan = None
 
 DATASET_DIR = Path(__file__).resolve().parent / "kable-dataset"
 DEFAULT_SUBJECTS: tuple[str, ...] = ("BioMedicine",)
+DEFAULT_CONCURRENCY = 20
+BACKENDS: tuple[str, ...] = ("python", "polars")
+_READ_CHUNK_SIZE = 1 << 20
+_SUBJECTS_CACHE_NAME = ".subjects_cache.json"
+PROMPT_FIELDS: tuple[str, ...] = ("prompt", "query", "question", "input")
+# Matches every raw ``"subject": ...`` pair so rows can be filtered before
+# parsing. The group captures plain string values; it is ``None`` for values
+# with escapes or of another type, which are left for the full JSON parser.
+_SUBJECT_PATTERN = re.compile(rb'"subject"\s*:\s*(?:"([^"\\]*)")?')
 
 
-@dataclass(frozen=True)
+def loads_json(data: bytes | str) -> Any:
+    """Parse a single JSON document, using :mod:`orjson` when it is installed."""
+
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_json(value: object) -> bytes:
+    """Serialise ``value`` to compact UTF-8 encoded JSON."""
+
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _find_prompt_field(payload: Mapping[str, object]) -> str:
+    for field_name in PROMPT_FIELDS:
+        value = payload.get(field_name)
+        if isinstance(value, str) and value.strip():
+            return field_name
+    raise KeyError(
+        "Could not find a prompt field in the example. Looked for one of: "
+        + ", ".join(PROMPT_FIELDS)
+    )
+
+
+def guess_prompt(payload: Mapping[str, object]) -> str:
+    """Best-effort extraction of the prompt text from the payload."""
+
+    return str(payload[_find_prompt_field(payload)])
+
+
+class PromptLookup:
+    """Callable variant of :func:`guess_prompt` that remembers the matching field.
+
+    Datasets are usually homogeneous, so the field that held the previous
+    prompt is tried first and :data:`PROMPT_FIELDS` is only scanned again when
+    it is missing or empty.
+    """
+
+    __slots__ = ("_field",)
+
+    def __init__(self) -> None:
+        self._field: str | None = None
+
+    def __call__(self, payload: Mapping[str, object]) -> str:
+        if self._field is not None:
+            value = payload.get(self._field)
+            if isinstance(value, str) and value.strip():
+                return value
+        self._field = _find_prompt_field(payload)
+        return str(payload[self._field])
+
+
+@dataclass(frozen=True, slots=True)
 class Example:
-    """Represents a single KaBLE prompt from the JSONL files."""
+    """Represents a single KaBLE prompt from the JSONL files.
+
+    Instances use ``__slots__`` since runs can create one per dataset row.
+    """
 
     payload: Mapping[str, object]
     source_file: Path
-
-    @property
-    def subject(self) -> str:
-        return str(self.payload["subject"])
+    subject: str
+    _json_bytes: bytes | None = field(default=None, init=False, repr=False, compare=False)
 
     def to_json(self) -> dict[str, object]:
         data = dict(self.payload)
         data["source_file"] = str(self.source_file)
         return data
 
+    @property
+    def json_bytes(self) -> bytes:
+        """The :meth:`to_json` record serialised once and reused by every writer."""
+
+        if self._json_bytes is None:
+            object.__setattr__(self, "_json_bytes", dumps_json(self.to_json()))
+        return self._json_bytes
+
 
 @dataclass(frozen=True)
 class RunSummary:
-    """Summary information returned after scheduling experiments."""
+    """Summary information returned after scheduling experiments.
+
+    ``subject_counts`` is ordered by subject name, matching ``subjects``.
+    ``output_path`` is the prompts file, or the runner's output when the
+    prompts were not written; it is ``None`` if neither exists.
+    """
 
     total_examples: int
     subjects: tuple[str, ...]
     subject_counts: dict[str, int]
-    output_path: Path
+    output_path: Path | None
 
     def __str__(self) -> str:  # pragma: no cover - human readable helper
         subject_breakdown = ", ".join(
-            f"{subject}: {count}" for subject, count in sorted(self.subject_counts.items())
+            f"{subject}: {count}" for subject, count in self.subject_counts.items()
         )
         return (
             f"Prepared {self.total_examples} examples "
@@ -55,36 +154,260 @@ class RunSummary:
         )
 
 
+@dataclass(kw_only=True)
+class BatchingRunner(ABC):
+    """Base class for runners that process examples in length-binned batches.
+
+    :func:`run_experiments` calls :meth:`submit` for every example and
+    :meth:`flush` once at the end. Examples are grouped into bins of prompts
+    whose lengths fall in the same ``bin_width``-character range, and a bin is
+    handed to :meth:`run_batch` as soon as it holds ``batch_size`` examples.
+    Batched local models then pad each batch to similar lengths instead of the
+    longest prompt in the dataset.
+
+    ``batch_size`` and ``bin_width`` are keyword-only, so dataclass subclasses
+    may declare required fields such as the model to run.
+    """
+
+    batch_size: int = 16
+    bin_width: int = 256
+    _bins: dict[int, list[Example]] = field(default_factory=dict, init=False, repr=False)
+    _prompt: PromptLookup = field(default_factory=PromptLookup, init=False, repr=False)
+
+    @abstractmethod
+    def run_batch(self, examples: Sequence[Example]) -> None:
+        """Run the model on a batch of examples with similar prompt lengths."""
+
+    def submit(self, example: Example) -> None:
+        key = len(self._prompt(example.payload)) // self.bin_width
+        batch = self._bins.setdefault(key, [])
+        batch.append(example)
+        if len(batch) >= self.batch_size:
+            del self._bins[key]
+            self.run_batch(batch)
+
+    def flush(self) -> None:
+        bins, self._bins = self._bins, {}
+        for key in sorted(bins):
+            self.run_batch(bins[key])
+
+
+def _iter_blocks(path: Path) -> Iterator[bytes]:
+    """Yield ``path`` in blocks of roughly 1 MiB that each end on a line boundary.
+
+    The shard is memory-mapped and the kernel is advised that it will be read
+    sequentially, so pages are prefetched ahead of the parser. Each block is
+    still copied out of the mapping into a ``bytes`` object, as the line
+    splitter and Hyperscan scan expect.
+    """
+
+    with path.open("rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        if not size:
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            start = 0
+            while start < size:
+                newline = mapped.find(b"\n", start + _READ_CHUNK_SIZE - 1)
+                end = size if newline == -1 else newline + 1
+                yield mapped[start:end]
+                start = end
+
+
+def _split_lines(block: bytes) -> Iterator[bytes]:
+    for line in block.split(b"\n"):
+        if line and not line.isspace():
+            yield line
+
+
+@lru_cache(maxsize=8)
+def _subject_database(allowed_subjects: frozenset[str]) -> Any:
+    """Compile a Hyperscan database matching the allowed ``"subject"`` pairs.
+
+    Two further expressions flag subject values containing escapes and values
+    that are not strings (such as numbers), which are left for the JSON parser
+    like on the regex path. Returns ``None`` for non-ASCII subjects because
+    Hyperscan's caseless matching only folds ASCII.
+    """
+
+    if not all(subject.isascii() for subject in allowed_subjects):
+        return None
+
+    expressions = [rb'"subject"\s*:\s*"[^"\\]*\\', rb'"subject"\s*:\s*[^"\s]']
+    expressions += [
+        rb'"subject"\s*:\s*"' + re.escape(subject).encode("ascii") + rb'"'
+        for subject in sorted(allowed_subjects)
+    ]
+    database = hyperscan.Database()
+    database.compile(
+        expressions=expressions,
+        ids=list(range(len(expressions))),
+        elements=len(expressions),
+        flags=hyperscan.HS_FLAG_CASELESS,
+    )
+    return database
+
+
+def _matching_lines(database: Any, block: bytes) -> Iterator[bytes]:
+    """Yield the lines of ``block`` that contain a match from ``database``."""
+
+    match_ends: list[int] = []
+
+    def _on_match(_id: int, _start: int, end: int, _flags: int, _context: object) -> None:
+        match_ends.append(end)
+
+    database.scan(block, match_event_handler=_on_match)
+    match_ends.sort()
+
+    line_end = -1
+    for match_end in match_ends:
+        if match_end <= line_end:
+            continue
+        line_start = block.rfind(b"\n", 0, match_end) + 1
+        line_end = block.find(b"\n", match_end)
+        if line_end == -1:
+            line_end = len(block)
+        yield block[line_start:line_end]
+
+
+def _rejects_line(line: bytes, allowed_subjects: frozenset[str]) -> bool:
+    """Return ``True`` when no ``"subject"`` pair on ``line`` can be allowed.
+
+    Nested objects may carry their own ``"subject"`` keys, so a line is only
+    rejected when every pair holds a plain string and none of those strings is
+    allowed. Lines without any pair are rejected too, as the Hyperscan scan
+    never reports them.
+    """
+
+    values = [match.group(1) for match in _SUBJECT_PATTERN.finditer(line)]
+    if None in values:
+        return False
+    return not any(value.decode("utf-8").lower() in allowed_subjects for value in values)
+
+
+def _iter_shard(jsonl_path: Path, allowed_subjects: frozenset[str] | None) -> Iterator[Example]:
+    """Yield the examples of a single JSONL shard that match ``allowed_subjects``.
+
+    With a subject filter, rows are rejected on their raw bytes before being
+    parsed: a Hyperscan database scans whole blocks at once when the package is
+    installed, otherwise each line is checked with :data:`_SUBJECT_PATTERN`.
+    """
+
+    database = None
+    if allowed_subjects is not None and hyperscan is not None:
+        database = _subject_database(allowed_subjects)
+
+    for block in _iter_blocks(jsonl_path):
+        lines = _split_lines(block) if database is None else _matching_lines(database, block)
+        for line in lines:
+            if allowed_subjects is not None and database is None and _rejects_line(line, allowed_subjects):
+                continue
+            payload = loads_json(line)
+            subject = str(payload["subject"])
+            if allowed_subjects is not None and subject.lower() not in allowed_subjects:
+                continue
+            yield Example(payload=payload, source_file=jsonl_path, subject=subject)
+
+
+def _parse_shard(jsonl_path: Path, allowed_subjects: frozenset[str] | None) -> list[Example]:
+    return list(_iter_shard(jsonl_path, allowed_subjects))
+
+
 def iter_examples(
     *,
     dataset_dir: Path | None = None,
     subject_filter: Sequence[str] | None = None,
+    parallel: bool = False,
 ) -> Iterator[Example]:
-    """Yield examples from the dataset, optionally filtering by subject."""
+    """Yield examples from the dataset, optionally filtering by subject.
+
+    With ``parallel=True`` every shard is parsed in a separate worker process.
+    Examples are still yielded in the same order, but each shard is fully
+    parsed before any of its examples are returned. Shards not yet started are
+    cancelled when the generator is closed early.
+    """
 
     dataset_root = dataset_dir or DATASET_DIR
-    allowed_subjects = {subject.lower() for subject in subject_filter} if subject_filter else None
+    allowed_subjects = _allowed_subjects(subject_filter)
+    shards = sorted(dataset_root.glob("*.jsonl"))
+
+    if not parallel or len(shards) < 2:
+        for jsonl_path in shards:
+            yield from _iter_shard(jsonl_path, allowed_subjects)
+        return
+
+    workers = min(len(shards), os.cpu_count() or 1)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        parse = partial(_parse_shard, allowed_subjects=allowed_subjects)
+        for shard_examples in executor.map(parse, shards, chunksize=1):
+            yield from shard_examples
+    finally:
+        # Closing the generator early (e.g. after ``max_examples``) must not
+        # wait for the shards that are still queued.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _dataset_fingerprint(shards: Sequence[Path]) -> list[list[object]]:
+    fingerprint: list[list[object]] = []
+    for shard in shards:
+        stat = shard.stat()
+        fingerprint.append([shard.name, stat.st_mtime_ns, stat.st_size])
+    return fingerprint
+
+
+def discover_subject_counts(dataset_dir: Path | None = None) -> dict[str, int]:
+    """Return the number of examples available for each subject.
+
+    The counts are cached in ``<dataset_dir>/.subjects_cache.json`` together
+    with the name, modification time and size of every shard, so the dataset is
+    only rescanned after one of the shards changes.
+    """
 
-    for jsonl_path in sorted(dataset_root.glob("*.jsonl")):
-        with jsonl_path.open("r", encoding="utf-8") as handle:
-            for line_number, line in enumerate(handle, start=1):
-                text = line.strip()
-                if not text:
-                    continue
-                payload = json.loads(text)
-                subject = str(payload["subject"])
-                if allowed_subjects is not None and subject.lower() not in allowed_subjects:
-                    continue
-                yield Example(payload=payload, source_file=jsonl_path)
+    dataset_root = dataset_dir or DATASET_DIR
+    shards = sorted(dataset_root.glob("*.jsonl"))
+    fingerprint = _dataset_fingerprint(shards)
+    cache_path = dataset_root / _SUBJECTS_CACHE_NAME
+
+    try:
+        cached = loads_json(cache_path.read_bytes())
+    except (OSError, ValueError):
+        cached = None
+    if isinstance(cached, dict) and cached.get("fingerprint") == fingerprint:
+        return dict(cached["subject_counts"])
+
+    counts: Counter[str] = Counter()
+    for shard in shards:
+        for example in _iter_shard(shard, None):
+            counts[example.subject] += 1
+    subject_counts = {subject: counts[subject] for subject in sorted(counts)}
+
+    # The cache is only an optimisation; read-only dataset directories are fine.
+    # Each writer uses its own temporary file so concurrent runs cannot clobber
+    # each other's half-written cache before it is atomically moved into place.
+    temporary_name = None
+    try:
+        with tempfile.NamedTemporaryFile(
+            dir=dataset_root, prefix=f"{_SUBJECTS_CACHE_NAME}.", suffix=".tmp", delete=False
+        ) as temporary:
+            temporary_name = temporary.name
+            temporary.write(
+                dumps_json({"fingerprint": fingerprint, "subject_counts": subject_counts})
+            )
+        os.replace(temporary_name, cache_path)
+    except OSError:
+        if temporary_name is not None:
+            with suppress(OSError):
+                os.unlink(temporary_name)
+    return subject_counts
 
 
 def discover_subjects(dataset_dir: Path | None = None) -> tuple[str, ...]:
     """Return all available subjects in the dataset."""
 
-    subjects: set[str] = set()
-    for example in iter_examples(dataset_dir=dataset_dir):
-        subjects.add(example.subject)
-    return tuple(sorted(subjects))
+    return tuple(sorted(discover_subject_counts(dataset_dir)))
 
 
 def _build_output_path(
@@ -110,13 +433,138 @@ def _build_output_path(
     return output_dir / f"{stem}.jsonl"
 
 
+def _allowed_subjects(subject_filter: Sequence[str] | None) -> frozenset[str] | None:
+    return frozenset(subject.lower() for subject in subject_filter) if subject_filter else None
+
+
+def _has_nulls(series: Any) -> bool:
+    """Return ``True`` if ``series`` holds a null at any nesting level."""
+
+    import polars as pl
+
+    if series.null_count():
+        return True
+    if isinstance(series.dtype, pl.Struct):
+        return any(_has_nulls(series.struct.field(field.name)) for field in series.dtype.fields)
+    if isinstance(series.dtype, (pl.List, pl.Array)):
+        return _has_nulls(series.explode(empty_as_null=False))
+    return False
+
+
+def _prepare_with_polars(
+    shards: Sequence[Path],
+    allowed_subjects: frozenset[str] | None,
+    output_file: Path,
+    max_examples: int | None,
+) -> Counter[str]:
+    """Filter each shard with a lazy Polars query and write the matching rows.
+
+    Shards are queried one at a time with the schema inferred from every row,
+    so each keeps its own keys. Polars fills keys missing from some rows with
+    nulls and cannot tell them apart from null values, so any null raises a
+    :class:`ValueError` instead of silently changing the rows.
+    """
+
+    try:
+        import polars as pl
+    except ImportError as error:
+        raise ImportError("The polars backend requires the 'polars' package.") from error
+
+    counts: Counter[str] = Counter()
+    remaining = max_examples
+    with output_file.open("wb") as handle:
+        for shard in shards:
+            if remaining == 0:
+                break
+            if not shard.stat().st_size:
+                continue
+            query = pl.scan_ndjson(shard, infer_schema_length=None).with_columns(
+                pl.lit(str(shard)).alias("source_file")
+            )
+            if allowed_subjects is not None:
+                query = query.filter(
+                    pl.col("subject").cast(pl.Utf8).str.to_lowercase().is_in(sorted(allowed_subjects))
+                )
+            if remaining is not None:
+                query = query.head(remaining)
+
+            frame = query.collect()
+            if any(_has_nulls(column) for column in frame.get_columns()):
+                raise ValueError(
+                    f"{shard} has rows with missing keys or null values, which the polars "
+                    "backend cannot reproduce. Use the python backend instead."
+                )
+            frame.write_ndjson(handle)
+            counts.update(str(subject) for subject in frame.get_column("subject").to_list())
+            if remaining is not None:
+                remaining -= frame.height
+    return counts
+
+
+def _is_async_runner(runner: object) -> bool:
+    return inspect.iscoroutinefunction(getattr(runner, "submit", None))
+
+
+async def _drive(examples: Iterable[Example], runner: Any, concurrency: int) -> None:
+    """Submit ``examples`` to an async runner with at most ``concurrency`` in flight.
+
+    Examples are pulled lazily, so only the in-flight window is held in memory.
+    Runners that are async context managers are entered for the whole run.
+    """
+
+    pending: set[asyncio.Task[None]] = set()
+    async with runner if isinstance(runner, AbstractAsyncContextManager) else nullcontext():
+        try:
+            for example in examples:
+                if len(pending) >= concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+                pending.add(asyncio.create_task(runner.submit(example)))
+            await asyncio.gather(*pending)
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            raise
+
+
+def _write_examples(
+    examples: Iterable[Example],
+    handle: BinaryIO | None,
+    counts: defaultdict[str, int],
+) -> Iterator[Example]:
+    """Tally each example's subject and write it to ``handle`` (if any) while streaming."""
+
+    for example in examples:
+        counts[example.subject] += 1
+        if handle is not None:
+            handle.write(example.json_bytes)
+            handle.write(b"\n")
+        yield example
+
+
+def _summarise(counts: Mapping[str, int], output_path: Path | None) -> RunSummary:
+    subjects = tuple(sorted(counts))
+    return RunSummary(
+        total_examples=sum(counts.values()),
+        subjects=subjects,
+        subject_counts={subject: counts[subject] for subject in subjects},
+        output_path=output_path,
+    )
+
+
 def run_experiments(
     *,
     dataset_dir: Path | None = None,
     subjects: Sequence[str] | None = DEFAULT_SUBJECTS,
     output_path: Path | None = None,
-    runner: Callable[[Example], None] | None = None,
+    runner: Callable[[Example], None] | BatchingRunner | None = None,
     max_examples: int | None = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    parallel: bool = False,
+    backend: str = "python",
+    write_prompts: bool | None = None,
 ) -> RunSummary:
     """Prepare experiments for the provided subjects.
 
@@ -133,41 +581,95 @@ def run_experiments(
         Optional callable that will be invoked for each :class:`Example` to
         execute the actual model interaction. When ``None`` (the default), the
         function simply prepares the prompts without performing any inference.
+        Runners that are context managers are entered for the duration of the
+        run so they can keep resources such as output files open.
+        Runners exposing an ``async def submit(example)`` coroutine (such as
+        :class:`chatgpt_runner.AsyncChatGPTRunner`) are driven concurrently
+        instead, and entered first if they are async context managers. A :class:`BatchingRunner`
+        receives every example through ``submit`` followed by one ``flush``.
     max_examples:
         Optional cap on the number of examples to process. When provided, the
         first ``max_examples`` prompts matching the subject selection are
         prepared. This is useful for running quick smoke tests without
         processing the entire dataset.
+    concurrency:
+        Maximum number of in-flight ``submit`` calls for async runners.
+    parallel:
+        Parse the dataset shards in a process pool (see :func:`iter_examples`).
+    backend:
+        One of :data:`BACKENDS`. ``"polars"`` filters the shards with a lazy
+        Polars query instead of parsing rows in Python. It only prepares the
+        prompts file and cannot be combined with a ``runner``.
+    write_prompts:
+        Whether to write the filtered prompts to ``output_path``. Defaults to
+        ``True`` without a runner or when ``output_path`` is given, and
+        ``False`` for a runner without one, since runners persist each example
+        alongside its result. When skipped, the summary points at the runner's
+        ``output_path`` if it has one.
     """
 
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be at least 1, got {concurrency}.")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}. Expected one of: {', '.join(BACKENDS)}")
+    if backend != "python" and runner is not None:
+        raise ValueError(f"The {backend} backend only prepares prompts and cannot drive a runner.")
+    if backend != "python" and write_prompts is False:
+        raise ValueError(f"The {backend} backend always writes the prompts file.")
+    if write_prompts is None:
+        write_prompts = runner is None or output_path is not None
+
     dataset_root = dataset_dir or DATASET_DIR
     selected_subjects = None if subjects is None else tuple(subjects)
-    output_file = _build_output_path(subjects=selected_subjects, output_path=output_path)
+    output_file = (
+        _build_output_path(subjects=selected_subjects, output_path=output_path)
+        if write_prompts
+        else None
+    )
 
-    examples_iter = iter_examples(dataset_dir=dataset_root, subject_filter=selected_subjects)
-    examples: list[Example] = []
-    counts: Counter[str] = Counter()
+    if backend != "python":
+        counts = _prepare_with_polars(
+            sorted(dataset_root.glob("*.jsonl")),
+            _allowed_subjects(selected_subjects),
+            output_file,
+            max_examples,
+        )
+        return _summarise(counts, output_file)
 
-    for example in examples_iter:
-        examples.append(example)
-        counts[example.subject] += 1
-        if max_examples is not None and len(examples) >= max_examples:
-            break
-
-    with output_file.open("w", encoding="utf-8") as handle:
-        for example in examples:
-            json.dump(example.to_json(), handle, ensure_ascii=False)
-            handle.write("\n")
-            if runner is not None:
-                runner(example)
-
-    summary = RunSummary(
-        total_examples=len(examples),
-        subjects=tuple(sorted(counts)),
-        subject_counts=dict(counts),
-        output_path=output_file,
+    examples: Iterable[Example] = iter_examples(
+        dataset_dir=dataset_root,
+        subject_filter=selected_subjects,
+        parallel=parallel,
     )
-    return summary
+    if max_examples is not None:
+        examples = islice(examples, max_examples)
+
+    counts: defaultdict[str, int] = defaultdict(int)
+    async_runner = _is_async_runner(runner)
+    # Runners that hold resources (e.g. an open responses file) are closed once
+    # every example has been dispatched.
+    runner_context = (
+        runner if not async_runner and isinstance(runner, AbstractContextManager) else nullcontext()
+    )
+
+    with output_file.open("wb") if output_file is not None else nullcontext() as handle:
+        prepared = _write_examples(examples, handle, counts)
+        if async_runner:
+            asyncio.run(_drive(prepared, runner, concurrency))
+        else:
+            with runner_context:
+                if isinstance(runner, BatchingRunner):
+                    for example in prepared:
+                        runner.submit(example)
+                    runner.flush()
+                else:
+                    for example in prepared:
+                        if runner is not None:
+                            runner(example)
+
+    if output_file is None:
+        return _summarise(counts, getattr(runner, "output_path", None))
+    return _summarise(counts, output_file)
 
 
 def _parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
@@ -209,6 +711,20 @@ def _parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
         action="store_true",
         help="Limit the run to the first 5 matching examples for quick validation.",
     )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Parse the dataset shards in parallel worker processes.",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="python",
+        help=(
+            "Engine used to scan the dataset (default: %(default)s). The polars "
+            "backend requires the polars package."
+        ),
+    )
     return parser.parse_args(argv)
 
 
@@ -235,6 +751,8 @@ def main(argv: Sequence[str] | None = None) -> int:
         subjects=selected_subjects,
         output_path=args.output,
         max_examples=5 if args.test_mode else None,
+        parallel=args.parallel,
+        backend=args.backend,
     )
     print(summary)
     return 0
@@ -10,18 +10,24 @@ configuration (``$PORT``) supplied at runtime.
 
 from __future__ import annotations
 
-import json
 import os
 from pathlib import Path
 from typing import Iterable
 
 import streamlit as st
 
-from chatgpt_runner import ChatGPTRunner
-from run_experiments import DEFAULT_SUBJECTS, RunSummary, discover_subjects, run_experiments
+from chatgpt_runner import AsyncChatGPTRunner
+from run_experiments import (
+    DEFAULT_SUBJECTS,
+    RunSummary,
+    discover_subjects,
+    loads_json,
+    run_experiments,
+)
 
 _DEFAULT_DATASET_DIR = Path(__file__).resolve().parent / "kable-dataset"
 _PREVIEW_LIMIT = 5
+_DOWNLOAD_INLINE_LIMIT = 10 << 20
 _TEST_MODE_LIMIT = 5
 
 
@@ -44,17 +50,30 @@ def _preview_examples(path: Path, limit: int = _PREVIEW_LIMIT) -> list[dict[str,
     """Read up to ``limit`` examples from a JSONL file for preview."""
 
     examples: list[dict[str, object]] = []
-    with path.open("r", encoding="utf-8") as handle:
+    with path.open("rb") as handle:
         for line_number, line in enumerate(handle, start=1):
             if line_number > limit:
                 break
-            text = line.strip()
-            if not text:
+            if not line.strip():
                 continue
-            examples.append(json.loads(text))
+            examples.append(loads_json(line))
     return examples
 
 
+def _render_download(path: Path, label: str) -> None:
+    """Offer ``path`` for download without loading large files on every rerun."""
+
+    # Small files are embedded in the page; larger ones are only read when the
+    # user clicks the button.
+    data = path.read_bytes() if path.stat().st_size < _DOWNLOAD_INLINE_LIMIT else path.read_bytes
+    st.download_button(
+        label=label,
+        data=data,
+        file_name=path.name,
+        mime="application/json",
+    )
+
+
 def _ensure_port_configuration() -> None:
     """Configure Streamlit to honour the Cloud Run ``$PORT`` setting."""
 
@@ -67,7 +86,7 @@ def _ensure_port_configuration() -> None:
         os.environ.setdefault("STREAMLIT_SERVER_ADDRESS", "0.0.0.0")
 
 
-def _render_summary(summary: RunSummary) -> None:
+def _render_summary(summary: RunSummary, *, prompts_written: bool = True) -> None:
     """Render a textual and tabular summary of the run results."""
 
     st.success(
@@ -83,15 +102,10 @@ def _render_summary(summary: RunSummary) -> None:
         }
     )
 
-    with summary.output_path.open("rb") as handle:
-        data = handle.read()
+    if not prompts_written or summary.output_path is None:
+        return
 
-    st.download_button(
-        label="Download filtered prompts",
-        data=data,
-        file_name=summary.output_path.name,
-        mime="application/json",
-    )
+    _render_download(summary.output_path, "Download filtered prompts")
 
     preview = _preview_examples(summary.output_path)
     if preview:
@@ -141,7 +155,8 @@ def main() -> None:
         value="",
         help=(
             "Where to store the filtered prompts. Leave blank to use the "
-            "automatic outputs/<subjects>.jsonl location."
+            "automatic outputs/<subjects>.jsonl location. When prompts are sent "
+            "to ChatGPT, the prompts file is only written if a path is given."
         ),
     )
     output_path = Path(output_input).expanduser() if output_input.strip() else None
@@ -168,6 +183,7 @@ def main() -> None:
     chatgpt_model = "gpt-4o-mini"
     chatgpt_api_key = ""
     chatgpt_output_path: Path | None = None
+    chatgpt_use_cache = True
     if chatgpt_enabled:
         chatgpt_api_key = st.text_input(
             "OpenAI API key",
@@ -190,6 +206,14 @@ def main() -> None:
         )
         if chatgpt_output_input.strip():
             chatgpt_output_path = Path(chatgpt_output_input).expanduser()
+        chatgpt_use_cache = st.toggle(
+            "Reuse cached responses",
+            value=True,
+            help=(
+                "Skip the API call for prompts already answered by this model and "
+                "reuse the completion stored in outputs/<model>-cache.jsonl."
+            ),
+        )
 
     run_clicked = st.button("Prepare prompts")
 
@@ -197,10 +221,11 @@ def main() -> None:
         runner = None
         if chatgpt_enabled:
             try:
-                runner = ChatGPTRunner(
+                runner = AsyncChatGPTRunner(
                     model=chatgpt_model.strip() or "gpt-4o-mini",
                     api_key=chatgpt_api_key.strip() or None,
                     output_path=chatgpt_output_path,
+                    use_cache=chatgpt_use_cache,
                 )
             except ValueError as error:
                 st.error(str(error))
@@ -214,12 +239,16 @@ def main() -> None:
                 max_examples=_TEST_MODE_LIMIT if test_mode else None,
                 runner=runner,
             )
-        _render_summary(summary)
+        # Without a prompts file the summary points at the ChatGPT responses,
+        # which are rendered separately below.
+        prompts_written = runner is None or summary.output_path != runner.output_path
+        _render_summary(summary, prompts_written=prompts_written)
 
         if runner is not None:
             responses_path = runner.output_path
             if responses_path.exists():
                 st.success(f"ChatGPT responses saved to {responses_path}")
+                _render_download(responses_path, "Download ChatGPT responses")
                 preview = _preview_examples(responses_path)
                 if preview:
                     st.write(f"### ChatGPT preview (first {len(preview)} responses)")
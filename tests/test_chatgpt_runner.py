@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from unittest import mock
+
+import httpx
+
+import run_experiments
+
+if importlib.util.find_spec("openai") is not None:
+    import chatgpt_runner
+else:  # pragma: no cover - depends on the installed requirements
+    chatgpt_runner = None
+
+
+def _completion(content: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=None,
+    )
+
+
+class FakeCompletions:
+    def __init__(self) -> None:
+        self.prompts: list[str] = []
+
+    def create(self, *, model: str, messages: list[dict[str, str]]) -> SimpleNamespace:
+        self.prompts.append(messages[-1]["content"])
+        return _completion(f"answer {len(self.prompts)}")
+
+
+class FakeAsyncOpenAI:
+    instances: list[FakeAsyncOpenAI] = []
+    # Errors raised, in order, by the first calls across all instances.
+    failures: list[Exception] = []
+
+    def __init__(self, **kwargs: object) -> None:
+        self.kwargs = kwargs
+        self.prompts: list[str] = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        FakeAsyncOpenAI.instances.append(self)
+
+    async def _create(self, *, model: str, messages: list[dict[str, str]]) -> SimpleNamespace:
+        self.prompts.append(messages[-1]["content"])
+        # Yield a few times so concurrent submissions overlap.
+        for _ in range(3):
+            await asyncio.sleep(0)
+        if FakeAsyncOpenAI.failures:
+            raise FakeAsyncOpenAI.failures.pop(0)
+        return _completion(f"answer {len(self.prompts)}")
+
+    async def close(self) -> None:
+        await self.kwargs["http_client"].aclose()
+
+
+def _read_records(path: Path) -> list[dict[str, object]]:
+    with path.open("rb") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+@unittest.skipIf(chatgpt_runner is None, "openai is not installed")
+class ChatGPTRunnerCacheTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.example = next(run_experiments.iter_examples(subject_filter=("BioMedicine",)))
+        self.prompt = run_experiments.guess_prompt(self.example.payload)
+
+    def _sync_runner(self, tmpdir: str, **kwargs: object) -> tuple[object, FakeCompletions]:
+        runner = chatgpt_runner.ChatGPTRunner(
+            model="test-model",
+            api_key="test-key",
+            output_path=Path(tmpdir) / "responses.jsonl",
+            cache_path=Path(tmpdir) / "cache.jsonl",
+            **kwargs,
+        )
+        completions = FakeCompletions()
+        runner._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        return runner, completions
+
+    def test_cache_hits_are_persisted_across_runners(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            runner, completions = self._sync_runner(tmpdir)
+            with runner:
+                runner(self.example)
+                runner(self.example)
+            self.assertEqual(completions.prompts, [self.prompt])
+
+            runner, completions = self._sync_runner(tmpdir)
+            with runner:
+                runner(self.example)
+            self.assertEqual(completions.prompts, [])
+
+            records = _read_records(Path(tmpdir) / "responses.jsonl")
+        self.assertEqual([record["cached"] for record in records], [False, True, True])
+        self.assertEqual({record["response"] for record in records}, {"answer 1"})
+
+    def test_disabled_cache_always_calls_the_api(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            runner, completions = self._sync_runner(tmpdir, use_cache=False)
+            with runner:
+                runner(self.example)
+                runner(self.example)
+
+            self.assertEqual(len(completions.prompts), 2)
+            self.assertFalse((Path(tmpdir) / "cache.jsonl").exists())
+
+    def test_truncated_cache_line_is_skipped(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            cache_path = Path(tmpdir) / "cache.jsonl"
+            key = chatgpt_runner._cache_key("test-model", self.prompt)
+            cache_path.write_bytes(
+                json.dumps({"key": key, "response": "x"}).encode("utf-8")
+                + b'\n{"key":"b","resp'
+            )
+
+            runner, completions = self._sync_runner(tmpdir)
+            with runner:
+                runner(self.example)
+            self.assertEqual(completions.prompts, [])
+
+            other = next(run_experiments.iter_examples(subject_filter=("Math",)))
+            with runner:
+                runner(other)
+
+            reloaded, _ = self._sync_runner(tmpdir)
+            other_key = chatgpt_runner._cache_key(
+                "test-model", run_experiments.guess_prompt(other.payload)
+            )
+            self.assertEqual(reloaded._cache.get(key), "x")
+            self.assertEqual(reloaded._cache.get(other_key), "answer 1")
+
+    def test_async_runner_shares_in_flight_requests(self) -> None:
+        FakeAsyncOpenAI.instances.clear()
+        FakeAsyncOpenAI.failures.clear()
+
+        async def submit_concurrently(runner: object) -> None:
+            async with runner:
+                await asyncio.gather(*(runner.submit(self.example) for _ in range(3)))
+
+        with TemporaryDirectory() as tmpdir, mock.patch.object(
+            chatgpt_runner, "AsyncOpenAI", FakeAsyncOpenAI
+        ):
+            runner = chatgpt_runner.AsyncChatGPTRunner(
+                model="test-model",
+                api_key="test-key",
+                output_path=Path(tmpdir) / "responses.jsonl",
+                cache_path=Path(tmpdir) / "cache.jsonl",
+            )
+            asyncio.run(submit_concurrently(runner))
+            asyncio.run(submit_concurrently(runner))
+
+            records = _read_records(Path(tmpdir) / "responses.jsonl")
+
+        first_client, second_client = FakeAsyncOpenAI.instances
+        self.assertEqual(first_client.prompts, [self.prompt])
+        self.assertEqual(second_client.prompts, [])
+        self.assertEqual(first_client.kwargs["max_retries"], 0)
+        self.assertEqual(sorted(record["cached"] for record in records), [False] + [True] * 5)
+
+    def test_async_runner_retries_server_errors(self) -> None:
+        FakeAsyncOpenAI.instances.clear()
+        request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+        FakeAsyncOpenAI.failures[:] = [
+            chatgpt_runner.InternalServerError(
+                "server error", response=httpx.Response(500, request=request), body=None
+            )
+        ]
+        sleep = asyncio.sleep
+        delays: list[float] = []
+
+        async def skip_backoff(delay: float) -> None:
+            delays.append(delay)
+            await sleep(0)
+
+        async def run(runner: object) -> None:
+            async with runner:
+                await runner.submit(self.example)
+
+        with TemporaryDirectory() as tmpdir, mock.patch.object(
+            chatgpt_runner, "AsyncOpenAI", FakeAsyncOpenAI
+        ), mock.patch.object(chatgpt_runner.asyncio, "sleep", skip_backoff):
+            runner = chatgpt_runner.AsyncChatGPTRunner(
+                model="test-model",
+                api_key="test-key",
+                output_path=Path(tmpdir) / "responses.jsonl",
+                use_cache=False,
+            )
+            asyncio.run(run(runner))
+
+            records = _read_records(Path(tmpdir) / "responses.jsonl")
+
+        self.assertEqual(FakeAsyncOpenAI.failures, [])
+        self.assertEqual(FakeAsyncOpenAI.instances[0].prompts, [self.prompt, self.prompt])
+        self.assertGreaterEqual(max(delays), 1)
+        self.assertEqual([record["response"] for record in records], ["answer 2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+import asyncio
+import importlib.util
 import json
+import shutil
 import unittest
+from dataclasses import dataclass
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from typing import Sequence
+from unittest import mock
 
 import run_experiments
 
@@ -36,11 +42,59 @@ class RunExperimentsTestCase(unittest.TestCase):
                 subjects = {json.loads(line)["subject"] for line in handle if line.strip()}
             self.assertEqual(subjects, {"Math"})
 
+    def test_subject_counts_are_ordered_by_subject(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            summary = run_experiments.run_experiments(
+                subjects=("Math", "Law"),
+                output_path=Path(tmpdir) / "math-law.jsonl",
+            )
+
+        self.assertEqual(summary.subjects, ("Law", "Math"))
+        self.assertEqual(list(summary.subject_counts), ["Law", "Math"])
+        self.assertEqual(summary.total_examples, 2600)
+
     def test_discover_subjects_includes_biomedicine(self) -> None:
-        subjects = run_experiments.discover_subjects()
+        # Work on a copy so the subject cache is not written into the bundled dataset.
+        with TemporaryDirectory() as tmpdir:
+            dataset_dir = shutil.copytree(run_experiments.DATASET_DIR, Path(tmpdir) / "dataset")
+            subjects = run_experiments.discover_subjects(dataset_dir)
         self.assertIn("BioMedicine", subjects)
         self.assertGreater(len(subjects), 1)
 
+    def test_discovered_subjects_are_cached_until_shards_change(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            dataset_dir = Path(tmpdir)
+            shard = dataset_dir / "shard.jsonl"
+            shard.write_text('{"subject": "Math"}\n{"subject": "Law"}\n', encoding="utf-8")
+
+            self.assertEqual(run_experiments.discover_subjects(dataset_dir), ("Law", "Math"))
+            self.assertEqual(
+                sorted(path.name for path in dataset_dir.iterdir()),
+                [".subjects_cache.json", "shard.jsonl"],
+            )
+
+            with mock.patch.object(run_experiments, "_iter_shard") as iter_shard:
+                self.assertEqual(run_experiments.discover_subjects(dataset_dir), ("Law", "Math"))
+            iter_shard.assert_not_called()
+
+            shard.write_text(
+                '{"subject": "Math"}\n{"subject": "Econ"}\n{"subject": "Math"}\n',
+                encoding="utf-8",
+            )
+            with mock.patch.object(run_experiments.os, "replace", side_effect=PermissionError):
+                self.assertEqual(
+                    run_experiments.discover_subject_counts(dataset_dir),
+                    {"Econ": 1, "Math": 2},
+                )
+            self.assertEqual(
+                sorted(path.name for path in dataset_dir.iterdir()),
+                [".subjects_cache.json", "shard.jsonl"],
+            )
+            self.assertEqual(
+                run_experiments.discover_subject_counts(dataset_dir),
+                {"Econ": 1, "Math": 2},
+            )
+
     def test_test_mode_limits_examples(self) -> None:
         with TemporaryDirectory() as tmpdir:
             output_path = Path(tmpdir) / "test-mode.jsonl"
@@ -56,6 +110,334 @@ class RunExperimentsTestCase(unittest.TestCase):
                 lines = [line for line in handle.readlines() if line.strip()]
             self.assertEqual(len(lines), 5)
 
+    def test_iter_examples_handles_lines_split_across_reads(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            dataset_dir = Path(tmpdir)
+            (dataset_dir / "empty.jsonl").write_bytes(b"")
+            (dataset_dir / "shard.jsonl").write_bytes(
+                b'{"subject": "Math", "idx": 0}\n\n'
+                b'{"subject": "BioMedicine", "idx": 1}\r\n'
+                b'{"subject": "Math", "idx": 2}'
+            )
+
+            with mock.patch.object(run_experiments, "_READ_CHUNK_SIZE", 7):
+                examples = list(run_experiments.iter_examples(dataset_dir=dataset_dir))
+
+        self.assertEqual([example.payload["idx"] for example in examples], [0, 1, 2])
+
+    def test_subject_filter_skips_rows_before_parsing(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            dataset_dir = Path(tmpdir)
+            (dataset_dir / "shard.jsonl").write_bytes(
+                b'{"query": "Quoted \\"subject\\": \\"Math\\"", "subject": "BioMedicine", "idx": 0}\n'
+                b'{"subject": "Math", "idx": 1}\n'
+                b'{"subject": "Bio\\u004dedicine", "idx": 2}\n'
+                b'{"subject" : "BIOMEDICINE", "idx": 3}\n'
+                b'{"meta": {"subject": "Math"}, "subject": "BioMedicine", "idx": 4}\n'
+            )
+
+            for hyperscan_module in (run_experiments.hyperscan, None):
+                with self.subTest(hyperscan=hyperscan_module is not None), mock.patch.object(
+                    run_experiments, "hyperscan", hyperscan_module
+                ), mock.patch.object(
+                    run_experiments, "loads_json", wraps=run_experiments.loads_json
+                ) as loads:
+                    examples = list(
+                        run_experiments.iter_examples(
+                            dataset_dir=dataset_dir,
+                            subject_filter=("biomedicine",),
+                        )
+                    )
+
+                self.assertEqual([example.payload["idx"] for example in examples], [0, 2, 3, 4])
+                self.assertEqual(loads.call_count, 4)
+
+    def test_subject_filter_keeps_non_string_subjects_and_skips_missing_ones(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            dataset_dir = Path(tmpdir)
+            (dataset_dir / "shard.jsonl").write_bytes(
+                b'{"subject": 5, "idx": 0}\n'
+                b'{"subject": "Math", "idx": 1}\n'
+                b'{"subject" : 5, "idx": 2}\n'
+                b'{"idx": 3, "query": "nosubj"}\n'
+            )
+
+            for hyperscan_module in (run_experiments.hyperscan, None):
+                with self.subTest(hyperscan=hyperscan_module is not None), mock.patch.object(
+                    run_experiments, "hyperscan", hyperscan_module
+                ):
+                    examples = list(
+                        run_experiments.iter_examples(dataset_dir=dataset_dir, subject_filter=("5",))
+                    )
+
+                self.assertEqual([example.payload["idx"] for example in examples], [0, 2])
+
+    @unittest.skipUnless(importlib.util.find_spec("hyperscan"), "hyperscan is not installed")
+    def test_hyperscan_prefilter_matches_regex_prefilter(self) -> None:
+        subjects = ("biomedicine", "Law")
+        with mock.patch.object(run_experiments, "_READ_CHUNK_SIZE", 4096):
+            scanned = list(run_experiments.iter_examples(subject_filter=subjects))
+            with mock.patch.object(run_experiments, "hyperscan", None):
+                expected = list(run_experiments.iter_examples(subject_filter=subjects))
+
+        self.assertEqual(scanned, expected)
+        self.assertEqual(len(scanned), 2600)
+
+    def test_parallel_parsing_matches_sequential_order(self) -> None:
+        sequential = list(run_experiments.iter_examples(subject_filter=("Math",)))
+        parallel = list(run_experiments.iter_examples(subject_filter=("Math",), parallel=True))
+
+        self.assertEqual(parallel, sequential)
+
+    def test_closing_parallel_iterator_cancels_remaining_shards(self) -> None:
+        with mock.patch.object(
+            run_experiments.ProcessPoolExecutor,
+            "shutdown",
+            autospec=True,
+            side_effect=run_experiments.ProcessPoolExecutor.shutdown,
+        ) as shutdown:
+            examples = run_experiments.iter_examples(parallel=True)
+            next(examples)
+            examples.close()
+
+        shutdown.assert_any_call(mock.ANY, wait=False, cancel_futures=True)
+
+    def test_columnar_backend_rejects_runner(self) -> None:
+        with self.assertRaises(ValueError):
+            run_experiments.run_experiments(backend="polars", runner=lambda example: None)
+
+    @unittest.skipUnless(importlib.util.find_spec("polars"), "polars is not installed")
+    def test_polars_backend_matches_python_backend(self) -> None:
+        self._assert_backend_matches_python("polars")
+
+    @unittest.skipUnless(importlib.util.find_spec("polars"), "polars is not installed")
+    def test_polars_backend_keeps_each_shard_schema(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            dataset_dir = Path(tmpdir) / "dataset"
+            dataset_dir.mkdir()
+            (dataset_dir / "a.jsonl").write_bytes(b"")
+            (dataset_dir / "b.jsonl").write_bytes(
+                b"".join(b'{"subject": "Math", "idx": %d}\n' % idx for idx in range(150))
+            )
+            (dataset_dir / "c.jsonl").write_bytes(
+                b'{"subject": "Math", "extra": "x", "meta": {"level": 2}}\n'
+            )
+
+            rows = {}
+            for backend in ("python", "polars"):
+                output_path = Path(tmpdir) / f"{backend}.jsonl"
+                run_experiments.run_experiments(
+                    dataset_dir=dataset_dir,
+                    subjects=("Math",),
+                    output_path=output_path,
+                    backend=backend,
+                )
+                with output_path.open("rb") as handle:
+                    rows[backend] = [json.loads(line) for line in handle]
+
+            self.assertEqual(rows["polars"], rows["python"])
+            self.assertEqual(rows["polars"][-1]["meta"], {"level": 2})
+            self.assertNotIn("extra", rows["polars"][0])
+
+            (dataset_dir / "c.jsonl").write_bytes(
+                (dataset_dir / "b.jsonl").read_bytes()
+                + b'{"subject": "Math", "extra": "x", "meta": {"level": 2}}\n'
+            )
+            with self.assertRaises(ValueError):
+                run_experiments.run_experiments(
+                    dataset_dir=dataset_dir,
+                    subjects=("Math",),
+                    output_path=Path(tmpdir) / "mixed.jsonl",
+                    backend="polars",
+                )
+
+    def _assert_backend_matches_python(self, backend: str) -> None:
+        with TemporaryDirectory() as tmpdir:
+            expected_path = Path(tmpdir) / "python.jsonl"
+            actual_path = Path(tmpdir) / f"{backend}.jsonl"
+            expected = run_experiments.run_experiments(
+                subjects=("Math", "Law"), output_path=expected_path, max_examples=1500
+            )
+            actual = run_experiments.run_experiments(
+                subjects=("Math", "Law"), output_path=actual_path, max_examples=1500, backend=backend
+            )
+
+            self.assertEqual(actual.subject_counts, expected.subject_counts)
+            with expected_path.open("rb") as handle:
+                expected_rows = [json.loads(line) for line in handle]
+            with actual_path.open("rb") as handle:
+                actual_rows = [json.loads(line) for line in handle]
+            self.assertEqual(actual_rows, expected_rows)
+
+    def test_example_json_bytes_is_serialised_once(self) -> None:
+        example = next(run_experiments.iter_examples())
+
+        encoded = example.json_bytes
+        self.assertIs(example.json_bytes, encoded)
+        self.assertEqual(run_experiments.loads_json(encoded), example.to_json())
+
+    def test_example_has_no_instance_dict(self) -> None:
+        example = next(run_experiments.iter_examples())
+
+        self.assertFalse(hasattr(example, "__dict__"))
+        with self.assertRaises(AttributeError):
+            example.source_file = Path("elsewhere.jsonl")  # type: ignore[misc]
+
+    def test_prompt_lookup_reprobes_when_the_cached_field_is_missing(self) -> None:
+        lookup = run_experiments.PromptLookup()
+
+        self.assertEqual(lookup({"query": "first"}), "first")
+        self.assertEqual(lookup({"query": "second", "prompt": ""}), "second")
+        self.assertEqual(lookup({"question": "third"}), "third")
+        self.assertEqual(lookup({"query": "fourth"}), "fourth")
+        with self.assertRaises(KeyError):
+            lookup({"query": "   "})
+
+    def test_stdlib_json_fallback_matches_orjson(self) -> None:
+        record = {"subject": "BioMedicine", "query": "Naïve question?", "idx": 3}
+        encoded = run_experiments.dumps_json(record)
+
+        with mock.patch.object(run_experiments, "orjson", None):
+            self.assertEqual(run_experiments.dumps_json(record), encoded)
+            self.assertEqual(run_experiments.loads_json(encoded + b"\n"), record)
+
+    def test_context_manager_runner_is_closed_after_run(self) -> None:
+        events: list[str] = []
+
+        class ClosingRunner:
+            def __enter__(self) -> "ClosingRunner":
+                events.append("enter")
+                return self
+
+            def __exit__(self, *exc_info: object) -> None:
+                events.append("exit")
+
+            def __call__(self, example: run_experiments.Example) -> None:
+                events.append("call")
+
+        with TemporaryDirectory() as tmpdir:
+            run_experiments.run_experiments(
+                output_path=Path(tmpdir) / "closing.jsonl",
+                runner=ClosingRunner(),
+                max_examples=2,
+            )
+
+        self.assertEqual(events, ["enter", "call", "call", "exit"])
+
+    def test_prompts_file_is_skipped_when_runner_is_attached(self) -> None:
+        class PathRunner:
+            def __init__(self, output_path: Path) -> None:
+                self.output_path = output_path
+                self.calls = 0
+
+            def __call__(self, example: run_experiments.Example) -> None:
+                self.calls += 1
+
+        with TemporaryDirectory() as tmpdir:
+            prompts_path = Path(tmpdir) / "prompts.jsonl"
+            runner = PathRunner(Path(tmpdir) / "responses.jsonl")
+            with mock.patch.object(run_experiments, "_build_output_path") as build_output_path:
+                summary = run_experiments.run_experiments(runner=runner, max_examples=3)
+
+            build_output_path.assert_not_called()
+            self.assertEqual(summary.output_path, runner.output_path)
+            self.assertEqual(runner.calls, 3)
+
+            summary = run_experiments.run_experiments(
+                output_path=prompts_path,
+                runner=runner,
+                max_examples=3,
+            )
+            self.assertTrue(prompts_path.exists())
+            self.assertEqual(summary.output_path, prompts_path)
+
+            run_experiments.run_experiments(
+                output_path=Path(tmpdir) / "skipped.jsonl",
+                runner=runner,
+                max_examples=3,
+                write_prompts=False,
+            )
+            self.assertFalse((Path(tmpdir) / "skipped.jsonl").exists())
+
+    def test_batching_runner_groups_examples_by_prompt_length(self) -> None:
+        @dataclass
+        class RecordingBatchRunner(run_experiments.BatchingRunner):
+            batches: list[list[int]]
+
+            def run_batch(self, examples: Sequence[run_experiments.Example]) -> None:
+                self.batches.append(
+                    [len(run_experiments.guess_prompt(example.payload)) // 64 for example in examples]
+                )
+
+        runner = RecordingBatchRunner([], batch_size=4, bin_width=64)
+        with TemporaryDirectory() as tmpdir:
+            summary = run_experiments.run_experiments(
+                output_path=Path(tmpdir) / "batched.jsonl",
+                runner=runner,
+                max_examples=50,
+            )
+
+        self.assertEqual(sum(len(batch) for batch in runner.batches), summary.total_examples)
+        for batch in runner.batches:
+            self.assertLessEqual(len(batch), 4)
+            self.assertEqual(len(set(batch)), 1)
+        self.assertGreater(len({batch[0] for batch in runner.batches}), 1)
+
+    def test_concurrency_must_be_positive(self) -> None:
+        with self.assertRaises(ValueError):
+            run_experiments.run_experiments(concurrency=0)
+
+    def test_async_runner_is_driven_concurrently(self) -> None:
+        class RecordingRunner:
+            def __init__(self) -> None:
+                self.seen: list[run_experiments.Example] = []
+                self.in_flight = 0
+                self.peak = 0
+                self.entered = False
+                self.exited = False
+
+            async def __aenter__(self) -> "RecordingRunner":
+                self.entered = True
+                return self
+
+            async def __aexit__(self, *exc_info: object) -> None:
+                self.exited = True
+
+            async def submit(self, example: run_experiments.Example) -> None:
+                self.in_flight += 1
+                self.peak = max(self.peak, self.in_flight)
+                await asyncio.sleep(0)
+                self.seen.append(example)
+                self.in_flight -= 1
+
+        runner = RecordingRunner()
+        with TemporaryDirectory() as tmpdir:
+            summary = run_experiments.run_experiments(
+                output_path=Path(tmpdir) / "async.jsonl",
+                runner=runner,
+                max_examples=10,
+                concurrency=3,
+            )
+
+        self.assertTrue(runner.entered and runner.exited)
+        self.assertEqual(len(runner.seen), summary.total_examples)
+        self.assertLessEqual(runner.peak, 3)
+        self.assertGreater(runner.peak, 1)
+
+    def test_async_runner_without_context_manager_is_driven(self) -> None:
+        class PlainAsyncRunner:
+            def __init__(self) -> None:
+                self.calls = 0
+
+            async def submit(self, example: run_experiments.Example) -> None:
+                self.calls += 1
+
+        runner = PlainAsyncRunner()
+        summary = run_experiments.run_experiments(runner=runner, max_examples=4, concurrency=2)
+
+        self.assertEqual(runner.calls, 4)
+        self.assertEqual(summary.total_examples, 4)
+
 
 if __name__ == "__main__":
     unittest.main()